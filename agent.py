@@ -4,10 +4,124 @@ This module contains the core logic for the interview agent.
 The ExcelInterviewerAgent class acts as a state machine, managing the flow
 of the interview, tracking user progress, and interacting with the LLM service.
 """
+import io
+import os
 import json
 import random
-from llm_service import call_llm
-from prompts import get_evaluation_prompt, get_welcome_prompt, get_conclusion_prompt, get_summary_prompt
+import logging
+import functools
+from concurrent.futures import Future
+from prompts import get_evaluation_prompt, get_welcome_prompt, get_conclusion_prompt, get_summary_prompt, get_warmup_prompt
+
+log = logging.getLogger(__name__)
+
+# --- Generation Limits ---
+# An evaluation is a short JSON object, but GLM-4.5 may still reason internally and
+# that can count toward the cap, so it keeps headroom; a truncated evaluation is unusable.
+# The summary needs room for a few paragraphs.
+EVALUATION_MAX_TOKENS = 1024
+SUMMARY_MAX_TOKENS = 800
+# Summary notes carry a short label for the question and answer, not their full text.
+NOTE_LABEL_CHARS = 60
+
+# Streamlit's resource cache shares the parsed question bank across all sessions.
+# Outside of Streamlit (e.g. scripts), a plain in-process memoization is used instead.
+try:
+    import streamlit as st
+    _cache_resource = st.cache_resource
+except ImportError:
+    _cache_resource = functools.lru_cache(maxsize=None)
+
+@_cache_resource
+def load_question_bank(filepath: str) -> dict:
+    """
+    Loads the categorized question bank from a JSON file.
+    The result is cached and shared between sessions, so it must be treated as read-only.
+    """
+    try:
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        # Provides a graceful fallback if the question bank is missing.
+        print(f"Error: The file {filepath} was not found.")
+        return {"easy": [], "medium": [], "hard": []}
+
+def check_llm_credentials():
+    """
+    Fail-fast: raises if the Hugging Face API token is not configured.
+    The LLM service is imported lazily, so the token is checked here, when an
+    agent is created, rather than on the first request mid-interview.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    if not os.getenv("HF_TOKEN"):
+        raise ValueError("Hugging Face API token not found. Please create a .env file and set the HF_TOKEN variable.")
+
+# The LLM service (network stack) and the answer cache (disk-backed) are
+# loaded on first use, so loading this module, e.g. on a Streamlit rerun, stays cheap.
+@functools.cache
+def _get_llm_service():
+    """Imports and returns the `llm_service` module."""
+    import llm_service
+    return llm_service
+
+@functools.cache
+def _get_answer_cache():
+    """Creates the single answer cache shared by every interview in this process."""
+    from answer_cache import AnswerCache
+    return AnswerCache()
+
+def _shorten(text: str, limit: int) -> str:
+    """Collapses whitespace and truncates `text` to `limit` characters, marking any cut with "..."."""
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+def _parse_evaluation(llm_response_str: str):
+    """
+    Parses an evaluation response.
+
+    Returns:
+        dict | None: The evaluation, or None if it is not a JSON object with a boolean `is_correct`.
+    """
+    try:
+        evaluation = json.loads(llm_response_str)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(evaluation, dict) or not isinstance(evaluation.get("is_correct"), bool):
+        return None
+    return evaluation
+
+def _evaluate_answer(question: dict, user_input: str, on_token=None) -> str:
+    """
+    Evaluates an answer, reusing a stored evaluation of an equivalent answer when possible.
+    Runs on a worker thread, so the answer cache lookup (and its first-use load from
+    disk) never blocks the UI.
+
+    Args:
+        question (dict): The question from the playlist.
+        user_input (str): The user's submitted answer.
+        on_token (callable, optional): Streams the LLM response if given.
+
+    Returns:
+        str: The LLM's response string.
+    """
+    answer_cache = _get_answer_cache()
+    cached_response = answer_cache.lookup(question['id'], user_input)
+    if cached_response is not None:
+        return cached_response
+
+    # Call the LLM with the simple prompt. The LLM will either praise or give a hint.
+    llm_service = _get_llm_service()
+    messages = get_evaluation_prompt(question['question_text'], user_input, question['correct_formula'])
+    if on_token is not None:
+        llm_response_str = llm_service.call_llm_stream(messages, on_token, max_tokens=EVALUATION_MAX_TOKENS)
+    else:
+        llm_response_str = llm_service.call_llm(messages, max_tokens=EVALUATION_MAX_TOKENS)
+
+    # Only well-formed, genuine evaluations are reused for later answers.
+    if llm_response_str not in llm_service.FALLBACK_RESPONSES and _parse_evaluation(llm_response_str) is not None:
+        answer_cache.add(question['id'], user_input, llm_response_str)
+    return llm_response_str
 
 class ExcelInterviewerAgent:
     """
@@ -15,52 +129,54 @@ class ExcelInterviewerAgent:
     
     Attributes:
         state (str): The current state of the interview (e.g., INTRODUCTION, EVALUATING).
-        history (list): A running log of the conversation.
+        history (list): A running log of the conversation, used for display.
         interview_playlist (list): The specific list of questions for this session.
         current_question_index (int): The index of the current question in the playlist.
         attempts_for_current_question (int): The number of attempts the user has made on the current question.
+        summary_future (Future): The in-flight summary request, if one has not been collected yet.
     """
-    def __init__(self, interview_config: dict = {'easy': 2, 'medium': 2, 'hard': 1}):
+    def __init__(self, interview_config: dict = {'easy': 2, 'medium': 2, 'hard': 1}, seed: int | None = None):
         """
         Initializes the agent with a specific interview configuration.
         
         Args:
             interview_config (dict): Specifies how many questions of each
                                      difficulty to ask.
+            seed (int, optional): Seeds the question selection, making the playlist
+                                  reproducible (e.g. for tests). Random if omitted.
         """
+        check_llm_credentials()
         self.state = "INTRODUCTION"
         self.history = []
-        self.all_questions = self._load_questions("question_bank.json")
+        # The summary's notes, formatted as each one is recorded so nothing is re-joined at conclusion.
+        self._notes_buffer = io.StringIO()
+        self.rng = random.Random(seed)
+        self.all_questions = load_question_bank("question_bank.json")
         self.interview_playlist = self._prepare_interview_playlist(interview_config)
         self.current_question_index = 0
         self.attempts_for_current_question = 0
-
-    def _load_questions(self, filepath: str) -> dict:
-        """Loads the categorized question bank from a JSON file."""
-        try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            # Provides a graceful fallback if the question bank is missing.
-            print(f"Error: The file {filepath} was not found.")
-            return {"easy": [], "medium": [], "hard": []}
+        self.summary_future = None
 
     def _prepare_interview_playlist(self, config: dict) -> list:
         """Creates a random, non-repeating list of questions for the session."""
-        playlist = []
-        for difficulty, count in config.items():
-            if difficulty in self.all_questions:
-                available_questions = self.all_questions[difficulty]
-                num_to_select = min(count, len(available_questions))
-                playlist.extend(random.sample(available_questions, num_to_select))
-        
+        playlist = [
+            question
+            for difficulty, count in config.items()
+            for question in self.rng.sample(
+                self.all_questions.get(difficulty, []),
+                min(count, len(self.all_questions.get(difficulty, []))),
+            )
+        ]
+
         # Shuffle the final playlist to mix the difficulty levels during the interview.
-        random.shuffle(playlist)
+        self.rng.shuffle(playlist)
         print(f"--- Interview playlist created with {len(playlist)} questions. ---")
         return playlist
 
     def start_interview(self):
         """Transitions the agent to the asking state and gets the first question."""
+        # Load the LLM service before any state changes, so a failure leaves the agent as it was.
+        _get_llm_service()
         self.state = "ASKING_QUESTION"
         self.get_next_question()
 
@@ -68,6 +184,8 @@ class ExcelInterviewerAgent:
         """
         Prepares and appends the next question to the history, or concludes the interview.
         """
+        # Load the LLM service before any state changes, so a failure leaves the agent as it was.
+        llm_service = _get_llm_service()
         if self.current_question_index >= len(self.interview_playlist):
             self.conclude_interview()
             return
@@ -78,37 +196,84 @@ class ExcelInterviewerAgent:
         self.history.append({"role": "assistant", "content": question_text})
         self.state = "EVALUATING" # Set state to await user's answer.
 
-    def process_user_response(self, user_input: str) -> dict:
+        # While the user is typing, warm the provider's cache for the evaluation prompt prefix.
+        llm_service.warm_prompt_cache(get_warmup_prompt())
+
+    def process_user_response(self, user_input: str, on_token=None) -> dict:
         """
         Processes the user's answer, calls the LLM, and manages the retry/advance logic.
+        This blocks until the evaluation is complete; see `start_evaluation` and
+        `finish_evaluation` for the non-blocking equivalent.
 
         Args:
             user_input (str): The user's submitted answer.
+            on_token (callable, optional): If given, the LLM response is streamed and
+                                           this is called with the text received so far.
 
         Returns:
             dict: A dictionary containing the LLM's feedback and state information for the UI.
         """
-        self.history.append({"role": "user", "content": user_input})
-        
         if self.state != "EVALUATING":
+            self.history.append({"role": "user", "content": user_input})
             return {"role": "assistant", "content": "Let's move to the next question."}
 
+        future = self.start_evaluation(user_input, on_token=on_token)
+        return self.finish_evaluation(future.result())
+
+    def start_evaluation(self, user_input: str, on_token=None) -> Future:
+        """
+        Records the user's answer and starts evaluating it on a worker thread.
+        Must only be called while the agent is in the EVALUATING state.
+
+        Args:
+            user_input (str): The user's submitted answer.
+            on_token (callable, optional): If given, the LLM response is streamed and
+                                           this is called (from a worker thread) with
+                                           the text received so far.
+
+        Returns:
+            Future: Resolves to the LLM's response string; pass it to `finish_evaluation`.
+        """
+        self.history.append({"role": "user", "content": user_input})
         current_q = self.interview_playlist[self.current_question_index]
         self.attempts_for_current_question += 1
-        
-        # Call the LLM with the simple prompt. The LLM will either praise or give a hint.
-        messages = get_evaluation_prompt(current_q['question_text'], user_input, current_q['correct_formula'])
-        llm_response_str = call_llm(messages)
-        
-        try:
-            evaluation = json.loads(llm_response_str)
-            feedback = evaluation.get("explanation", "I've noted that.")
-            is_correct = evaluation.get("is_correct", False)
-        except (json.JSONDecodeError, TypeError):
-            feedback = "An error occurred during evaluation. Let's proceed."
-            is_correct = False
+        return _get_llm_service().run_in_worker(_evaluate_answer, current_q, user_input, on_token)
+
+    def finish_evaluation(self, llm_response_str: str) -> dict:
+        """
+        Applies a completed evaluation and manages the retry/advance logic.
 
+        Args:
+            llm_response_str (str): The result of the future returned by `start_evaluation`.
+
+        Returns:
+            dict: A dictionary containing the LLM's feedback and state information for the UI.
+        """
+        evaluation = _parse_evaluation(llm_response_str)
+        if evaluation is None or llm_response_str in _get_llm_service().FALLBACK_RESPONSES:
+            # The answer was never actually judged, so it must not use up an attempt.
+            self.attempts_for_current_question -= 1
+            if evaluation is not None:
+                feedback = f"{evaluation['explanation']} Please submit your answer again."
+            else:
+                feedback = "An error occurred during evaluation. Please submit your answer again."
+            self.history.append({"role": "assistant", "content": feedback})
+            return {"role": "assistant", "content": feedback, "is_correct": False, "attempts": self.attempts_for_current_question}
+
+        feedback = evaluation.get("explanation", "I've noted that.")
+        is_correct = evaluation["is_correct"]
+
+        # The user's answer is the last message, appended by `start_evaluation`.
+        user_answer = self.history[-1]["content"]
         self.history.append({"role": "assistant", "content": feedback})
+
+        # Keep a compact note of this attempt so the summary doesn't need the full transcript.
+        current_q = self.interview_playlist[self.current_question_index]
+        self._record_note(
+            f"Q{self.current_question_index + 1} ({_shorten(current_q['question_text'], NOTE_LABEL_CHARS)}): "
+            f"answer={_shorten(user_answer, NOTE_LABEL_CHARS)!r}, correct={is_correct}, "
+            f"attempts={self.attempts_for_current_question}, note={feedback[:120]}"
+        )
         
         # Handle the interview flow based on the LLM's verdict.
         if is_correct or self.attempts_for_current_question >= 2:
@@ -121,15 +286,42 @@ class ExcelInterviewerAgent:
             
         return {"role": "assistant", "content": feedback, "is_correct": is_correct, "attempts": self.attempts_for_current_question}
 
+    def _record_note(self, note: str):
+        """Appends a note for one evaluated answer to the pre-formatted summary buffer."""
+        self._notes_buffer.write(f"- {note}\n")
+
     def conclude_interview(self):
         """
-        Concludes the interview and triggers the generation of the summary report.
+        Concludes the interview and starts generating the summary report in the background.
+        The conclusion message is shown immediately; call `collect_summary` to append the report.
         """
         self.state = "CONCLUSION"
+
+        # Fire the summary request first so it runs while the conclusion is displayed.
+        summary_messages = get_summary_prompt(self._notes_buffer.getvalue())
+        # The summary is free text, so JSON mode is disabled for this request.
+        self.summary_future = _get_llm_service().call_llm_background(summary_messages, json_mode=False, max_tokens=SUMMARY_MAX_TOKENS)
+
         conclusion_message = get_conclusion_prompt()
         self.history.append({"role": "assistant", "content": conclusion_message})
-        
-        # Generate and append the summary report using the LLM.
-        summary_messages = get_summary_prompt(self.history)
-        summary_report = call_llm(summary_messages)
-        self.history.append({"role": "assistant", "content": f"### Performance Summary\n\n{summary_report}"})
\ No newline at end of file
+
+    @property
+    def summary_pending(self) -> bool:
+        """Whether a summary report is still waiting to be collected."""
+        return self.summary_future is not None
+
+    def collect_summary(self):
+        """
+        Waits for the background summary request and appends the report to the history.
+        """
+        if self.summary_future is None:
+            return
+        try:
+            summary_report = self.summary_future.result()
+        except Exception as e:
+            # Never leave the interview stuck on a failed summary request.
+            log.warning("--- Summary generation failed: %r ---", e)
+            summary_report = "Sorry, the performance summary could not be generated."
+        finally:
+            self.summary_future = None
+        self.history.append({"role": "assistant", "content": f"### Performance Summary\n\n{summary_report}"})
@@ -0,0 +1,129 @@
+# answer_cache.py
+"""
+This module provides a cache of answer evaluations, scoped per question.
+Candidates often type the same answer in slightly different ways
+(e.g. "=VLOOKUP(...)" vs "= vlookup( ... )"). Answers are reduced to a
+canonical form, and an answer whose canonical form matches one already
+evaluated for the same question reuses that evaluation instead of asking the LLM again.
+
+Only exact canonical matches are reused: a fuzzy match could hand the praise
+for a correct answer to a wrong one (e.g. "=SUM(A2:A5)" vs "=SUM(A2:A50)").
+"""
+import os
+import re
+import json
+import atexit
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+# --- Cache Configuration ---
+# File used to persist the cache between sessions.
+CACHE_PATH = "answer_cache.json"
+# New entries are written to disk in batches of this size (and at exit).
+SAVE_EVERY = 10
+# Bumped whenever `canonicalize` changes, so entries keyed by an older form are discarded.
+CACHE_VERSION = 2
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# An Excel string literal ("" is an escaped quote); an unterminated one runs to the end.
+_STRING_LITERAL_RE = re.compile(r'("(?:[^"]|"")*"?)')
+
+
+def canonicalize(user_input: str) -> str:
+    """
+    Reduces an answer to a canonical form: whitespace removed, uppercased,
+    and without a leading "=". Excel formulas are case- and space-insensitive
+    outside string literals, so only that text is normalized; the contents of
+    "..." literals (e.g. the " " separator in =A2 & " " & B2) are kept as typed.
+    """
+    # re.split with a capturing group alternates code (even) and literals (odd).
+    parts = _STRING_LITERAL_RE.split(user_input.strip())
+    canonical = "".join(
+        part if i % 2 else _WHITESPACE_RE.sub("", part).upper()
+        for i, part in enumerate(parts)
+    )
+    return canonical[1:] if canonical.startswith("=") else canonical
+
+
+class AnswerCache:
+    """
+    A thread-safe store mapping (question id, canonical answer) to LLM evaluations.
+
+    Attributes:
+        entries (dict): Stored LLM response strings, keyed by question id, then canonical answer.
+    """
+    def __init__(self, path: str = CACHE_PATH):
+        """
+        Loads any previously persisted cache.
+
+        Args:
+            path (str): Where the cache is saved.
+        """
+        self.path = path
+        # Shared by every Streamlit session thread, so all access goes through the lock.
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.entries = self._load()
+        atexit.register(self.save)
+
+    def _load(self) -> dict:
+        """Restores the entries from disk, or starts empty."""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                log.warning("--- Could not load answer cache: %s ---", e)
+                return {}
+            if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+                return data.get("entries", {})
+            log.warning("--- Discarding answer cache saved in an older format ---")
+        return {}
+
+    def save(self):
+        """Persists the entries so later sessions can reuse them."""
+        with self._lock:
+            if not self._unsaved:
+                return
+            snapshot = json.dumps({"version": CACHE_VERSION, "entries": self.entries})
+            self._unsaved = 0
+        try:
+            with open(self.path, 'w') as f:
+                f.write(snapshot)
+        except OSError as e:
+            log.warning("--- Could not save answer cache: %s ---", e)
+
+    def lookup(self, question_id: str, user_input: str):
+        """
+        Finds a stored evaluation for an equivalent answer to the same question.
+
+        Args:
+            question_id (str): The id of the question asked to the user.
+            user_input (str): The user's submitted answer.
+
+        Returns:
+            str | None: The cached LLM response string, or None on a miss.
+        """
+        with self._lock:
+            response = self.entries.get(question_id, {}).get(canonicalize(user_input))
+        if response is not None:
+            log.debug("--- Answer Cache Hit (question: %s) ---", question_id)
+        return response
+
+    def add(self, question_id: str, user_input: str, llm_response_str: str):
+        """
+        Stores a new evaluation, saving to disk once a batch has accumulated.
+
+        Args:
+            question_id (str): The id of the question asked to the user.
+            user_input (str): The user's submitted answer.
+            llm_response_str (str): The LLM's validated JSON response.
+        """
+        with self._lock:
+            self.entries.setdefault(question_id, {})[canonicalize(user_input)] = llm_response_str
+            self._unsaved += 1
+            should_save = self._unsaved >= SAVE_EVERY
+        if should_save:
+            self.save()
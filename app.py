@@ -4,14 +4,30 @@ This is the main entry point for the Streamlit web application.
 It handles the user interface, state management, and interaction with the
 ExcelInterviewerAgent.
 """
+import time
+import logging
 import streamlit as st
 from agent import ExcelInterviewerAgent
 from prompts import get_welcome_prompt
 
+# --- Logging ---
+# Log messages are printed to the terminal. Set LLM_LOG_LEVEL=DEBUG to also see
+# the raw and parsed LLM responses.
+logging.basicConfig(format="%(message)s")
+
 # --- Constants and Configuration ---
 # This configuration defines the structure of the interview.
 # It's defined here for easy modification.
 INTERVIEW_CONFIG = {'easy': 2, 'medium': 2, 'hard': 1}
+# Only the most recent messages are rendered on each rerun; older ones are paged in on demand.
+HISTORY_WINDOW = 20
+EARLIER_PAGE_SIZE = 25
+# How often (in seconds) an in-flight evaluation is polled for progress.
+POLL_INTERVAL = 0.2
+
+# The welcome text only depends on the question count, so it is cached across reruns.
+# The agent itself is deliberately NOT cached, as it holds per-session state.
+cached_welcome_prompt = st.cache_data(get_welcome_prompt)
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -31,22 +47,106 @@ if "agent" not in st.session_state:
     st.session_state.agent = ExcelInterviewerAgent(interview_config=INTERVIEW_CONFIG)
     st.session_state.interview_started = False
     st.session_state.show_next_btn = False
+    st.session_state.earlier_pages = 1
+    st.session_state.pending = None
     
     # The agent's history is initialized with the welcome message.
-    welcome_msg = get_welcome_prompt(len(st.session_state.agent.interview_playlist))
+    welcome_msg = cached_welcome_prompt(len(st.session_state.agent.interview_playlist))
     st.session_state.agent.history.append({"role": "assistant", "content": welcome_msg})
 
 # --- UI Rendering ---
-# The chat history is displayed on every script rerun to keep the UI updated.
-for message in st.session_state.agent.history:
+def render_message(message: dict):
+    """Renders a single chat message."""
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
+@st.fragment
+def render_history():
+    """
+    Renders the chat history as its own fragment.
+    Only a window of recent messages is rendered; older ones stay on the agent and
+    can be expanded on demand. The summary is built from the agent's notes, not the history.
+    """
+    history = st.session_state.agent.history
+    earlier, visible = history[:-HISTORY_WINDOW], history[-HISTORY_WINDOW:]
+
+    if earlier:
+        with st.expander(f"Show earlier messages ({len(earlier)})"):
+            # Page backwards through older messages, one page at a time.
+            shown = min(len(earlier), st.session_state.earlier_pages * EARLIER_PAGE_SIZE)
+            if shown < len(earlier) and st.button("Load older messages"):
+                st.session_state.earlier_pages += 1
+                st.rerun(scope="fragment")
+            for message in earlier[-shown:]:
+                render_message(message)
+
+    for message in visible:
+        render_message(message)
+
+    # Remember how much of the history this fragment has drawn.
+    st.session_state.last_rendered_len = len(history)
+
+@st.fragment
+def render_interview_input():
+    """
+    Renders the answer input (or "Next Question" button) as its own fragment.
+    Submitting an answer only reruns this fragment, so the history above is not redrawn.
+    The evaluation runs in the background and is polled until it completes.
+    """
+    agent = st.session_state.agent
+
+    # Messages added since the history fragment last ran are drawn here instead.
+    for message in agent.history[st.session_state.last_rendered_len:]:
+        render_message(message)
+
+    pending = st.session_state.pending
+    if pending is not None:
+        # An evaluation is running on a worker thread; show its progress and poll it.
+        with st.chat_message("assistant"):
+            st.markdown(pending["stream"]["text"] or "_Evaluating..._")
+        if pending["future"].done():
+            st.session_state.pending = None
+            response = agent.finish_evaluation(pending["future"].result())
+
+            # After processing, decide if the "Next Question" button should be shown.
+            # This happens if the user was correct OR if they've used all their attempts.
+            if response.get("is_correct") or response.get("attempts", 0) >= 2:
+                st.session_state.show_next_btn = True
+        else:
+            with st.spinner("Evaluating..."):
+                time.sleep(POLL_INTERVAL)
+        # Rerun only this fragment to display progress, the new messages and potentially the "Next Question" button.
+        st.rerun(scope="fragment")
+
+    elif st.session_state.show_next_btn:
+        # If true, hide the chat input and show only the "Next Question" button.
+        if st.button("Next Question"):
+            st.session_state.show_next_btn = False
+            with st.spinner("Loading next question..."):
+                agent.get_next_question()
+            # A full rerun moves the history window forward and handles the conclusion state.
+            st.rerun()
+    else:
+        # Show the chat input and wait for the user's answer.
+        if user_input := st.chat_input("Your formula or explanation..."):
+            # The worker thread streams the decoded explanation into this dict; the UI thread only reads it.
+            stream = {"text": ""}
+            future = agent.start_evaluation(user_input, on_token=lambda text: stream.update(text=text))
+            st.session_state.pending = {"future": future, "stream": stream}
+            st.rerun(scope="fragment")
+
+render_history()
+
 # --- Main Application Logic (State Machine) ---
 # The application's behavior is determined by the agent's current state.
 
 # State 1: Conclusion
 if st.session_state.agent.state == "CONCLUSION":
+    if st.session_state.agent.summary_pending:
+        # The conclusion message is already on screen while the summary generates.
+        with st.spinner("Generating your performance summary..."):
+            st.session_state.agent.collect_summary()
+        st.rerun()
     st.info("The interview has concluded. See your performance summary above.")
     if st.button("Restart Interview"):
         st.session_state.clear()  # Clear the entire session for a fresh start.
@@ -62,23 +162,4 @@ elif not st.session_state.interview_started:
 
 # State 3: Interview in Progress (Evaluating)
 else:
-    # This block manages the interaction during a question.
-    if st.session_state.show_next_btn:
-        # If true, hide the chat input and show only the "Next Question" button.
-        if st.button("Next Question"):
-            st.session_state.show_next_btn = False
-            with st.spinner("Loading next question..."):
-                st.session_state.agent.get_next_question()
-            st.rerun()
-    else:
-        # Show the chat input and wait for the user's answer.
-        if user_input := st.chat_input("Your formula or explanation..."):
-            with st.spinner("Evaluating..."):
-                response = st.session_state.agent.process_user_response(user_input)
-            
-            # After processing, decide if the "Next Question" button should be shown.
-            # This happens if the user was correct OR if they've used all their attempts.
-            if response.get("is_correct") or response.get("attempts", 0) >= 2:
-                st.session_state.show_next_btn = True
-
-            st.rerun() # Rerun to display the new messages and potentially the "Next Question" button.
\ No newline at end of file
+    render_interview_input()
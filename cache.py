@@ -0,0 +1,110 @@
+# cache.py
+"""
+This module provides a persistent, cross-session cache for LLM responses.
+Responses are stored in a local SQLite database, so a process restart or a
+new user session can still reuse evaluations produced earlier in the
+deployment's lifetime. Entries expire after a fixed time-to-live.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# --- Cache Configuration ---
+DB_PATH = "cache.db"
+# How long (in seconds) a stored response remains valid.
+TTL_SECONDS = 3600
+# Expired rows are deleted after this many writes.
+PURGE_EVERY = 100
+
+# A single connection shared across threads; the lock serializes access to it.
+_lock = threading.Lock()
+_writes_since_purge = 0
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Opens the database, tunes it for fast writes and ensures the schema exists."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS kv(k TEXT PRIMARY KEY, v TEXT, ts INTEGER)")
+    conn.commit()
+    return conn
+
+_conn = _connect(DB_PATH)
+
+def get_entry(key: str) -> tuple[str, int] | None:
+    """
+    Looks up an unexpired response along with when it was stored.
+
+    Args:
+        key (str): The request's cache key.
+
+    Returns:
+        tuple[str, int] | None: The stored response and its Unix timestamp,
+                                or None if missing or expired.
+    """
+    try:
+        with _lock:
+            row = _conn.execute(
+                "SELECT v, ts FROM kv WHERE k = ? AND ts > strftime('%s','now') - ?",
+                (key, TTL_SECONDS),
+            ).fetchone()
+    except sqlite3.Error as e:
+        log.warning("--- Persistent cache read failed: %s ---", e)
+        return None
+    return (row[0], row[1]) if row else None
+
+def get(key: str) -> str | None:
+    """
+    Looks up an unexpired response.
+
+    Args:
+        key (str): The request's cache key.
+
+    Returns:
+        str | None: The stored response, or None if missing or expired.
+    """
+    entry = get_entry(key)
+    return entry[0] if entry else None
+
+def put(key: str, val: str):
+    """
+    Stores (or refreshes) a response, periodically purging expired rows.
+
+    Args:
+        key (str): The request's cache key.
+        val (str): The response to store.
+    """
+    global _writes_since_purge
+    try:
+        with _lock:
+            _conn.execute(
+                "INSERT OR REPLACE INTO kv(k, v, ts) VALUES (?, ?, ?)",
+                (key, val, int(time.time())),
+            )
+            _conn.commit()
+            _writes_since_purge += 1
+            if _writes_since_purge >= PURGE_EVERY:
+                _purge_expired()
+    except sqlite3.Error as e:
+        log.warning("--- Persistent cache write failed: %s ---", e)
+
+def _purge_expired():
+    """Deletes expired rows. The caller must hold the lock."""
+    global _writes_since_purge
+    _conn.execute("DELETE FROM kv WHERE ts <= strftime('%s','now') - ?", (TTL_SECONDS,))
+    _conn.commit()
+    _writes_since_purge = 0
+
+def purge_expired():
+    """Deletes all expired rows from the cache."""
+    try:
+        with _lock:
+            _purge_expired()
+    except sqlite3.Error as e:
+        log.warning("--- Persistent cache purge failed: %s ---", e)
+
+# Start each process with a clean table.
+purge_expired()
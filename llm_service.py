@@ -5,12 +5,41 @@ It is responsible for sending requests, handling authentication, and robustly
 parsing the model's response.
 """
 import os
+import re
+import json
+import logging
+import asyncio
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import httpx
 import requests
 from dotenv import load_dotenv
+import cache as persistent_cache
 
 # Best Practice: Load sensitive credentials from a .env file.
 load_dotenv()
 
+# Debug output (raw and parsed responses) is only emitted when enabled,
+# e.g. with LLM_LOG_LEVEL=DEBUG, to avoid console I/O on every request.
+log = logging.getLogger(__name__)
+_log_level = os.getenv("LLM_LOG_LEVEL", "WARNING").upper()
+if isinstance(logging.getLevelName(_log_level), int):
+    log.setLevel(_log_level)
+else:
+    # An unknown level name must not stop the app from starting.
+    log.setLevel(logging.WARNING)
+    log.warning("--- Unknown LLM_LOG_LEVEL %r; using WARNING ---", _log_level)
+
+# Matches the outermost JSON object in a response, compiled once at import.
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+# Matches the (possibly still incomplete) "explanation" string value in a streamed JSON object.
+_EXPLANATION_RE = re.compile(r'"explanation"\s*:\s*"((?:[^"\\]|\\.)*)')
+# A trailing escape sequence that has not fully arrived yet.
+_PARTIAL_ESCAPE_RE = re.compile(r'\\(u[0-9a-fA-F]{0,3})?$')
+
 # --- API Configuration ---
 # Using the standardized Chat Completions API endpoint for broad compatibility.
 API_URL = "https://router.huggingface.co/v1/chat/completions"
@@ -29,78 +58,448 @@ headers = {
     "Content-Type": "application/json"
 }
 
-def _parse_response(full_response: str) -> str:
+# --- Connection Pooling ---
+# A shared session keeps the TCP/TLS connection alive between evaluations,
+# so only the first request pays the handshake cost.
+SESSION = requests.Session()
+SESSION.headers.update(headers)
+
+# Asynchronous requests run on a dedicated background event loop, which owns a
+# long-lived HTTP/2 client. This lets the Streamlit script keep rendering while
+# a request (e.g. the final summary) is in flight.
+_async_loop = asyncio.new_event_loop()
+threading.Thread(target=_async_loop.run_forever, name="llm-async-loop", daemon=True).start()
+ASYNC_CLIENT = httpx.AsyncClient(http2=True, headers=headers, timeout=180)
+
+# Blocking calls can also be handed to a worker pool, so the UI thread stays free
+# to redraw (e.g. to show streamed tokens) while the request is in flight.
+_EXEC = ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm-worker")
+
+# --- Fallback Responses ---
+# Returned when the API cannot produce a usable answer. These are never cached.
+UNEXPECTED_FORMAT_RESPONSE = '{"is_correct": false, "explanation": "Sorry, I received an unexpected response from the AI."}'
+CONNECTION_ERROR_RESPONSE = '{"is_correct": false, "explanation": "Sorry, I was unable to connect to the evaluation service."}'
+FALLBACK_RESPONSES = (UNEXPECTED_FORMAT_RESPONSE, CONNECTION_ERROR_RESPONSE)
+# Raised when a response body is not JSON (ValueError) or its structure is not as expected.
+_MALFORMED_RESULT_ERRORS = (ValueError, KeyError, IndexError, TypeError, AttributeError)
+
+# --- Generation Settings ---
+TEMPERATURE = 0.1 # Lower temperature for more predictable, factual JSON output.
+MAX_TOKENS = 1024 # The default; callers pass a smaller cap where they can.
+# The static prompt prefix is identical for every question, so one warm-up
+# request per interval is enough to keep the provider's prefix cache hot.
+WARMUP_INTERVAL_SECONDS = 300
+_last_warmup = 0.0
+
+class LLMCache:
+    """
+    An in-memory, exact-match cache for LLM responses.
+    Identical requests (same model, messages and generation settings) are
+    answered from memory instead of repeating the network round-trip.
+    Misses fall through to the persistent SQLite cache (see `cache.py`), so
+    responses also survive process restarts.
+
+    Attributes:
+        maxsize (int): The maximum number of responses kept before the least
+                       recently used entry is evicted. Entries also expire after
+                       the persistent cache's TTL.
+        stats (dict): Running counts of cache "hits" and "misses".
     """
-    Robustly extracts a JSON object from the LLM's raw output.
-    This handles cases where the model includes a <think> block for reasoning
-    or wraps the JSON in markdown code fences.
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._store = OrderedDict()
+        # Guards the store, as requests may complete on the background loop thread.
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(messages: list, temperature: float, max_tokens: int) -> str:
+        """Builds a stable SHA-256 key for a request."""
+        raw = json.dumps({"m": MODEL_ID, "msgs": messages, "t": temperature, "mt": max_tokens}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        Returns the cached response for a key (memory first, then disk), or None on a miss.
+        This may block on SQLite, so async code should run it in a thread.
+        """
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if time.time() - stored_at < persistent_cache.TTL_SECONDS:
+                    self._store.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                # Expired in memory; the disk copy has expired too.
+                del self._store[key]
+
+        entry = persistent_cache.get_entry(key)
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            # Keep the original timestamp so the entry expires on schedule.
+            self._store[key] = entry
+            self._evict()
+            return entry[0]
+
+    def put(self, key: str, value: str):
+        """Stores a response, evicting the oldest entry if the cache is full."""
+        with self._lock:
+            self._store[key] = (value, time.time())
+            self._store.move_to_end(key)
+            self._evict()
+        persistent_cache.put(key, value)
+
+    def _evict(self):
+        """Drops the least recently used entry once the cache is over capacity."""
+        if len(self._store) > self.maxsize:
+            self._store.popitem(last=False)
+
+# A single shared cache for the lifetime of the process.
+llm_cache = LLMCache()
+
+def _after_think(text: str) -> str:
+    """Returns the part of `text` after any <think> reasoning block."""
+    return text.split("</think>", 1)[-1] if "</think>" in text else text
+
+def _visible_stream_text(buffer: str) -> str:
+    """
+    Returns the streamed text that may be shown so far. While a <think> block is
+    still open, nothing after it has arrived yet, so "" is returned.
+    """
+    if "<think>" in buffer and "</think>" not in buffer:
+        return ""
+    return _after_think(buffer)
+
+def _parse_response(full_response: str, json_mode: bool = True) -> str:
+    """
+    Cleans the LLM's raw output. Any <think> block the model emits for reasoning is
+    removed first; free-text prompts such as the summary do not ask it to skip one.
+    Evaluation requests use the provider's JSON mode, so the rest is expected to be
+    the JSON object itself. If the provider ignores JSON mode, the outermost JSON
+    object is extracted from the text instead.
 
     Args:
         full_response (str): The complete raw text returned by the LLM.
+        json_mode (bool): Whether the response was requested as a JSON object.
 
     Returns:
-        str: A clean string that is expected to be a JSON object.
+        str: The cleaned response; a JSON object string when `json_mode` is set.
     """
-    # Print the full response for debugging purposes in the terminal.
-    print(f"--- Full LLM Raw Response ---\n{full_response}\n--------------------")
-
-    # First, isolate the part of the response after any <think> block.
-    if "</think>" in full_response:
-        clean_part = full_response.split("</think>", 1)[-1].strip()
-    else:
-        clean_part = full_response.strip()
-
-    # Second, surgically extract the JSON object by finding the first '{' and last '}'.
-    # This is highly resilient to extra text or markdown formatting around the JSON.
-    start_index = clean_part.find('{')
-    end_index = clean_part.rfind('}')
+    log.debug("--- Full LLM Raw Response ---\n%s\n--------------------", full_response)
 
-    if start_index != -1 and end_index != -1 and end_index > start_index:
-        json_string = clean_part[start_index : end_index + 1]
-        return json_string
-    else:
+    clean_part = _after_think(full_response).strip()
+    if not json_mode:
+        return clean_part
+    try:
+        json.loads(clean_part)
+        return clean_part
+    except json.JSONDecodeError:
+        match = _JSON_RE.search(clean_part)
+        if match:
+            return match.group(0)
         # If no JSON object is found, return the cleaned part for error handling.
-        print(f"--- Warning: Could not find a valid JSON object in the response part: {clean_part} ---")
+        log.warning("--- Could not find a valid JSON object in the response: %s ---", clean_part)
         return clean_part
 
-def call_llm(messages: list) -> str:
+def _build_payload(messages: list, stream: bool = False, json_mode: bool = True, max_tokens: int = MAX_TOKENS) -> dict:
+    """Builds the Chat Completions request body shared by all call types."""
+    payload = {
+        "model": MODEL_ID,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": TEMPERATURE,
+    }
+    if json_mode:
+        # Structured output: the response body is the JSON object, with no surrounding text.
+        payload["response_format"] = {"type": "json_object"}
+    if stream:
+        payload["stream"] = True
+    return payload
+
+def call_llm(messages: list, json_mode: bool = True, max_tokens: int = MAX_TOKENS) -> str:
     """
     Sends a list of messages to the LLM API and returns the parsed response.
 
     Args:
         messages (list): A list of message dictionaries to send to the model.
+        json_mode (bool): Whether to request a JSON object response. Disable for free text.
+        max_tokens (int): The cap on generated tokens; part of the cache key.
 
     Returns:
         str: The parsed JSON string from the LLM's response.
     """
-    print("--- Calling LLM ---")
+    # Serve repeated, identical requests straight from the cache.
+    cache_key = LLMCache.make_key(messages, TEMPERATURE, max_tokens)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        log.debug("--- LLM Cache Hit (stats: %s) ---", llm_cache.stats)
+        return cached
 
-    payload = {
-        "model": MODEL_ID,
-        "messages": messages,
-        "max_tokens": 1024,
-        "temperature": 0.1, # Lower temperature for more predictable, factual JSON output.
-    }
+    log.debug("--- Calling LLM ---")
+
+    payload = _build_payload(messages, json_mode=json_mode, max_tokens=max_tokens)
 
     try:
         # Make the API request with a timeout for resilience.
-        response = requests.post(API_URL, headers=headers, json=payload, timeout=180)
+        response = SESSION.post(API_URL, json=payload, timeout=180)
         # Raise an exception for bad status codes (like 401, 404, 500).
         response.raise_for_status()
-        result = response.json()
-        
-        if "choices" in result and result["choices"]:
-            full_response_content = result["choices"][0]["message"]["content"]
-            # Use the robust parsing function to get the clean JSON.
-            json_string = _parse_response(full_response_content)
-            print(f"--- Parsed LLM JSON: {json_string} ---")
-            return json_string
-        else:
-            print(f"--- Unexpected LLM Response Format: {result} ---")
-            # Return a default error JSON if the format is wrong.
-            return '{"is_correct": false, "explanation": "Sorry, I received an unexpected response from the AI."}'
+        return _handle_result(response.json(), cache_key, json_mode)
 
     except requests.exceptions.RequestException as e:
         # Handle network errors, timeouts, etc.
-        print(f"--- API Request Failed: {e} ---")
-        return '{"is_correct": false, "explanation": "Sorry, I was unable to connect to the evaluation service."}'
\ No newline at end of file
+        log.warning("--- API Request Failed: %s ---", e)
+        return CONNECTION_ERROR_RESPONSE
+    except _MALFORMED_RESULT_ERRORS as e:
+        # A malformed "choices" structure.
+        log.warning("--- Unexpected LLM Response Format: %r ---", e)
+        return UNEXPECTED_FORMAT_RESPONSE
+
+def _handle_result(result: dict, cache_key: str, json_mode: bool) -> str:
+    """
+    Extracts the content from a Chat Completions result and finalizes it.
+
+    Args:
+        result (dict): The decoded JSON body returned by the API.
+        cache_key (str): The cache key of the originating request.
+        json_mode (bool): Whether the request asked for a JSON object response.
+
+    Returns:
+        str: The parsed JSON string, or a fallback response if the format is wrong.
+    """
+    if "choices" in result and result["choices"]:
+        choice = result["choices"][0]
+        content = (choice.get("message") or {}).get("content")
+        return _finalize_response(content, choice.get("finish_reason"), cache_key, json_mode)
+    else:
+        log.warning("--- Unexpected LLM Response Format: %s ---", result)
+        # Return a default error JSON if the format is wrong.
+        return UNEXPECTED_FORMAT_RESPONSE
+
+def _finalize_response(content, finish_reason, cache_key: str, json_mode: bool) -> str:
+    """
+    Cleans a completed response and caches it only if it is usable.
+
+    Args:
+        content (str | None): The generated text, which may be missing.
+        finish_reason (str | None): Why generation stopped, e.g. "stop" or "length".
+        cache_key (str): The cache key of the originating request.
+        json_mode (bool): Whether the request asked for a JSON object response.
+
+    Returns:
+        str: The parsed JSON string, or a fallback response if it is unusable.
+    """
+    if content is None:
+        log.warning("--- Unexpected LLM Response Format: no content (finish_reason=%s) ---", finish_reason)
+        return UNEXPECTED_FORMAT_RESPONSE
+
+    # Clean the response (and check the JSON in JSON mode).
+    json_string = _parse_response(content, json_mode)
+    log.debug("--- Parsed LLM JSON: %s ---", json_string)
+
+    if finish_reason == "length":
+        # The output was cut off at max_tokens; never cache it.
+        log.warning("--- LLM response truncated at max_tokens ---")
+        return UNEXPECTED_FORMAT_RESPONSE if json_mode else json_string
+    if json_mode:
+        try:
+            json.loads(json_string)
+        except json.JSONDecodeError:
+            return UNEXPECTED_FORMAT_RESPONSE
+
+    # Only successful responses are cached; errors should be retried.
+    llm_cache.put(cache_key, json_string)
+    return json_string
+
+async def call_llm_async(messages: list, json_mode: bool = True, max_tokens: int = MAX_TOKENS) -> str:
+    """
+    The asynchronous counterpart of `call_llm`, using the shared HTTP/2 client.
+    Must be awaited on the background loop (see `call_llm_background`).
+
+    Args:
+        messages (list): A list of message dictionaries to send to the model.
+        json_mode (bool): Whether to request a JSON object response. Disable for free text.
+        max_tokens (int): The cap on generated tokens; part of the cache key.
+
+    Returns:
+        str: The parsed JSON string from the LLM's response.
+    """
+    cache_key = LLMCache.make_key(messages, TEMPERATURE, max_tokens)
+    # Cache reads and writes may block on SQLite, so they run off the event loop thread.
+    cached = await asyncio.to_thread(llm_cache.get, cache_key)
+    if cached is not None:
+        log.debug("--- LLM Cache Hit (stats: %s) ---", llm_cache.stats)
+        return cached
+
+    log.debug("--- Calling LLM (async) ---")
+
+    payload = _build_payload(messages, json_mode=json_mode, max_tokens=max_tokens)
+
+    try:
+        response = await ASYNC_CLIENT.post(API_URL, json=payload)
+        response.raise_for_status()
+        return await asyncio.to_thread(_handle_result, response.json(), cache_key, json_mode)
+
+    except httpx.HTTPError as e:
+        log.warning("--- API Request Failed: %s ---", e)
+        return CONNECTION_ERROR_RESPONSE
+    except _MALFORMED_RESULT_ERRORS as e:
+        # A non-JSON body or a malformed "choices" structure.
+        log.warning("--- Unexpected LLM Response Format: %r ---", e)
+        return UNEXPECTED_FORMAT_RESPONSE
+
+def call_llm_background(messages: list, json_mode: bool = True, max_tokens: int = MAX_TOKENS):
+    """
+    Starts an LLM request on the background loop without blocking the caller.
+
+    Args:
+        messages (list): A list of message dictionaries to send to the model.
+        json_mode (bool): Whether to request a JSON object response. Disable for free text.
+        max_tokens (int): The cap on generated tokens; part of the cache key.
+
+    Returns:
+        concurrent.futures.Future: Resolves to the parsed JSON string.
+    """
+    return asyncio.run_coroutine_threadsafe(call_llm_async(messages, json_mode, max_tokens), _async_loop)
+
+async def _warm_prefix_async(messages: list):
+    """Sends a 1-token request so the provider computes and caches the prompt prefix."""
+    payload = _build_payload(messages, json_mode=False, max_tokens=1)
+    try:
+        response = await ASYNC_CLIENT.post(API_URL, json=payload)
+        response.raise_for_status()
+        log.debug("--- Prompt prefix warmed up ---")
+    except httpx.HTTPError as e:
+        log.warning("--- Prompt warm-up failed: %s ---", e)
+
+def warm_prompt_cache(messages: list):
+    """
+    Pre-fills the provider's prompt cache with a static prefix, in the background.
+    The response is discarded and never cached. Calls within
+    `WARMUP_INTERVAL_SECONDS` of the previous warm-up are skipped.
+
+    Args:
+        messages (list): The static leading messages of an upcoming request.
+    """
+    global _last_warmup
+    now = time.monotonic()
+    if now - _last_warmup < WARMUP_INTERVAL_SECONDS:
+        return
+    _last_warmup = now
+    asyncio.run_coroutine_threadsafe(_warm_prefix_async(messages), _async_loop)
+
+def _stream_tokens(response):
+    """
+    Yields content tokens from a streaming (Server-Sent Events) response.
+
+    Args:
+        response: A `requests` response opened with `stream=True`.
+
+    Yields:
+        tuple: (token, finish_reason) for each chunk; either may be None.
+    """
+    # SSE is always UTF-8, but without a charset in the Content-Type `requests`
+    # would decode text/event-stream as ISO-8859-1 and garble non-ASCII text.
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        choices = chunk.get("choices")
+        if choices:
+            token = (choices[0].get("delta") or {}).get("content")
+            finish_reason = choices[0].get("finish_reason")
+            if token or finish_reason:
+                yield token, finish_reason
+
+def _partial_explanation(buffer: str) -> str:
+    """
+    Decodes as much of the "explanation" value as has arrived in a streamed JSON object.
+    Only this text is shown to the candidate; the raw JSON never is.
+
+    Args:
+        buffer (str): The JSON text received so far.
+
+    Returns:
+        str: The decoded explanation so far, or "" if it has not started yet.
+    """
+    match = _EXPLANATION_RE.search(_visible_stream_text(buffer))
+    if not match:
+        return ""
+    raw = _PARTIAL_ESCAPE_RE.sub("", match.group(1))
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return ""
+
+def call_llm_stream(messages: list, on_token, json_mode: bool = True, max_tokens: int = MAX_TOKENS) -> str:
+    """
+    Streams the LLM's response, reporting progress as tokens arrive.
+    The return value is identical to `call_llm`, so callers can use the
+    two interchangeably for the interview flow.
+
+    Args:
+        messages (list): A list of message dictionaries to send to the model.
+        on_token (callable): Called with the text to display so far after each token. In JSON
+                             mode this is the decoded "explanation" value, not the raw JSON.
+        json_mode (bool): Whether to request a JSON object response. Disable for free text.
+        max_tokens (int): The cap on generated tokens; part of the cache key.
+
+    Returns:
+        str: The parsed JSON string from the LLM's response.
+    """
+    cache_key = LLMCache.make_key(messages, TEMPERATURE, max_tokens)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        log.debug("--- LLM Cache Hit (stats: %s) ---", llm_cache.stats)
+        on_token(_partial_explanation(cached) if json_mode else cached)
+        return cached
+
+    log.debug("--- Calling LLM (streaming) ---")
+
+    payload = _build_payload(messages, stream=True, json_mode=json_mode, max_tokens=max_tokens)
+
+    try:
+        with SESSION.post(API_URL, json=payload, timeout=180, stream=True) as response:
+            response.raise_for_status()
+            buffer = ""
+            finish_reason = None
+            for token, reason in _stream_tokens(response):
+                if token:
+                    buffer += token
+                    visible = _partial_explanation(buffer) if json_mode else _visible_stream_text(buffer).lstrip()
+                    if visible:
+                        on_token(visible)
+                finish_reason = reason or finish_reason
+    except requests.exceptions.RequestException as e:
+        log.warning("--- API Request Failed: %s ---", e)
+        return CONNECTION_ERROR_RESPONSE
+
+    if not buffer:
+        log.warning("--- Unexpected LLM Response Format: empty stream ---")
+        return UNEXPECTED_FORMAT_RESPONSE
+
+    return _finalize_response(buffer, finish_reason, cache_key, json_mode)
+
+def run_in_worker(fn, *args, **kwargs) -> Future:
+    """
+    Runs a blocking function (e.g. `call_llm`, or a task that calls it) on a worker thread.
+
+    Args:
+        fn (callable): The function to run.
+        *args, **kwargs: Passed through to `fn`.
+
+    Returns:
+        Future: Resolves to the return value of `fn`.
+    """
+    return _EXEC.submit(fn, *args, **kwargs)
@@ -4,6 +4,74 @@ This module centralizes all prompt engineering for the application.
 It contains functions that generate structured prompts for the LLM
 to perform specific tasks like evaluation, summarization, and greeting.
 """
+from types import MappingProxyType
+
+# --- Static Prompt Messages ---
+# Built once at import time and read-only, so the content is byte-identical on
+# every call and the provider's prefix cache can match it.
+_SYSTEM_EVAL_MSG = MappingProxyType({
+    "role": "system",
+    "content": """You are an expert Excel interviewer named Excellytix AI. Your persona is helpful and encouraging. Your primary goal is to evaluate a candidate's answer and provide one of two responses based on its correctness.
+
+1.  **Analyze the user's answer.** Intelligently determine if it is functionally correct. It does not need to be an exact match.
+2.  **If the answer is correct:** Your JSON response MUST be `{"is_correct": true, "explanation": "<Your words of praise and positive feedback on why their answer is a good one.>"}`.
+3.  **If the answer is incorrect:** Your JSON response MUST be `{"is_correct": false, "explanation": "<A gentle, encouraging hint to guide the user toward the solution. DO NOT reveal the full answer in the hint.>"}`.
+4.  **Respond with a JSON object with keys is_correct (bool) and explanation (string).**
+    - Respond with ONLY the JSON object. Do not add any reasoning or other text before or after it.
+    - Do not wrap the JSON object in Markdown code blocks like ```json.
+
+**Input format.** Each task gives you three fields on separate lines:
+- `Q:` the interview question that was asked.
+- `Ref:` a reference answer. It is ONE correct answer, not the only one.
+- `A:` the candidate's submitted answer, exactly as typed.
+
+**Evaluation rubric.** Judge the candidate's answer against the intent of the question, not against the text of the reference answer.
+- **Equivalent formulas are correct.** Function names and cell references are case-insensitive in Excel, so `=sum(f3:f90)` is the same as `=SUM(F3:F90)`. Extra or missing spaces do not matter.
+- **Alternative functions are correct** when they produce the same result for the data described. For example, `INDEX`/`MATCH` or `XLOOKUP` may replace `VLOOKUP`, `SUMPRODUCT` may replace `SUMIFS`, and `IFS` may replace nested `IF` statements.
+- **Absolute and relative references.** Accept `$` anchors unless the question specifically asks about copying the formula, in which case the anchoring must be right.
+- **Ranges.** The range must cover the cells named in the question. A whole-column reference such as `A:A` is acceptable when it gives the same result.
+- **Arguments.** Argument order, lookup mode (exact vs approximate match) and criteria must be right. An approximate-match lookup where an exact match is needed is incorrect.
+- **Hints for incorrect answers.** Use the hint to point at the part that is missing or wrong.
+- **Off-topic or empty answers** are incorrect. Gently restate what the question is asking for in the hint.
+
+**Guidance by topic.** Apply these specific checks in addition to the general rubric.
+- **Arithmetic and basic aggregation** (`SUM`, `AVERAGE`, `COUNT`, `*`, `+`). The operator or function must match the calculation asked for. `COUNT` only counts numbers; `COUNTA` counts non-empty cells, so `COUNTA` is incorrect when the question asks for a count of numeric values, and vice versa. `=SUM(F3:F90)/COUNT(F3:F90)` is an acceptable alternative to `AVERAGE`. Adding the cells one by one (`=A2+A3+...`) is functionally correct for a short range but note in your praise that a range function scales better.
+- **Text joining and cleaning** (`&`, `CONCAT`, `CONCATENATE`, `TEXTJOIN`, `TRIM`). `CONCAT`, `CONCATENATE` and `TEXTJOIN` are all acceptable alternatives to `&` as long as the separator is included where the question requires one (for example, a space between first and last names). `TRIM` removes leading, trailing and repeated inner spaces; `CLEAN` alone does not remove spaces and is incorrect for that purpose.
+- **Text extraction** (`LEFT`, `RIGHT`, `MID`, `FIND`, `SEARCH`, `LEN`). `SEARCH` is an acceptable replacement for `FIND` (it is only less strict about case). `MID` starting one character after the delimiter is an acceptable alternative to `RIGHT` with `LEN`. `TEXTAFTER` and `TEXTSPLIT` are acceptable in modern Excel. A formula that hard-codes a character count instead of locating the delimiter is incorrect, because it only works for one specific value.
+- **Conditional aggregation** (`SUMIF`, `SUMIFS`, `COUNTIF`, `COUNTIFS`, `SUMPRODUCT`). Check that every condition in the question is present, that each criteria range is paired with the right criterion, and that the sum range is the column being totalled. Note that `SUMIF` takes the sum range last while `SUMIFS` takes it first; both are correct if the arguments are in the right order for the function used. Comparison criteria must be written as text, such as `">1000"`.
+- **Lookups** (`VLOOKUP`, `HLOOKUP`, `INDEX`/`MATCH`, `XLOOKUP`). The lookup value, the table or lookup range, the returned column and the match mode must all be right. `VLOOKUP` without `FALSE` (or `0`) as the last argument performs an approximate match and is incorrect for exact lookups such as IDs or names. References to another sheet must include the sheet name when the question places the data on a different sheet.
+- **Error handling** (`IFERROR`, `IFNA`). The whole lookup must be wrapped, and the fallback value must match the question (for example, an empty string `""` for a blank cell). `IFNA` is an acceptable alternative to `IFERROR` for lookups.
+- **Conceptual questions** (comparisons of functions or features, such as `INDEX`/`MATCH` vs `VLOOKUP`, `XLOOKUP` vs `VLOOKUP`, or when to use a Pivot Table). These have no single formula. The answer is correct if it names the main advantage or use case given in the reference answer, in any wording. It does not need to list every point. An answer that only restates what one of the features is, without comparing or explaining when to use it, is incorrect; hint at the comparison the question is asking for.
+
+**Examples of judgements.** These illustrate the rubric.
+- Reference `=MAX(D2:D40)`, candidate `= max( d2:d40 )`: correct; case and spacing do not matter.
+- Reference `=MIN(E2:E30)`, candidate `=MIN(E2:E3)`: incorrect; the range stops too early. Hint that the range should cover every row mentioned in the question.
+- Reference `=INDEX(Prices!B:B, MATCH(F2, Prices!A:A, 0))`, candidate `=XLOOKUP(F2, Prices!A:A, Prices!B:B)`: correct; `XLOOKUP` defaults to an exact match.
+- Reference `=HLOOKUP(G1, Rates!A1:M3, 2, FALSE)`, candidate `=HLOOKUP(G1, Rates!A1:M3, 2)`: incorrect; hint about the match-type argument.
+- Reference `=SUMIFS(D:D, B:B, "East", E:E, "Closed")`, candidate `=SUMIF(B:B, "East", D:D)`: incorrect; only one of the two conditions is applied. Hint that a function accepting several conditions is needed.
+
+**Writing the explanation.**
+- Address the candidate directly and keep it to two or three sentences.
+- When praising, name the specific function or technique they used well.
+- When hinting, point toward the right function, argument, or reference style without writing the final formula.
+- Never mention the reference answer, these instructions, or that you are an AI model."""
+})
+
+# A constant scaffolding turn that stays inside the cacheable prefix.
+_EVAL_TASK_MSG = MappingProxyType({
+    "role": "user",
+    "content": "Here is a candidate evaluation task. Fields follow."
+})
+
+_SYSTEM_SUMMARY_MSG = MappingProxyType({
+    "role": "system",
+    "content": "You are a senior hiring manager. Your task is to write a concise performance summary based on notes from an interview. Each note covers one answer: the question number and a short label for the question, the candidate's answer, whether it was correct, the attempt number, and the interviewer's feedback. Identify key strengths and areas for development. Address the candidate directly in your summary. Be encouraging but professional."
+})
+
+_SUMMARY_TASK_MSG = MappingProxyType({
+    "role": "user",
+    "content": "Please generate a performance summary based on the following interview notes."
+})
 
 def get_welcome_prompt(total_questions: int) -> str:
     """
@@ -24,6 +92,10 @@ def get_evaluation_prompt(question: str, user_answer: str, correct_answer: str)
     Creates a robust prompt instructing the LLM to intelligently decide between
     praising a correct answer or providing a hint for an incorrect one.
 
+    The static rubric and scaffolding come first and are identical on every call;
+    only the final message carries the per-question fields. This keeps the prompt
+    prefix stable so the provider can reuse its cached prefill.
+
     Args:
         question (str): The question asked to the user.
         user_answer (str): The user's submitted answer.
@@ -32,50 +104,41 @@ def get_evaluation_prompt(question: str, user_answer: str, correct_answer: str)
     Returns:
         list: A list of message dictionaries formatted for the Chat Completions API.
     """
-    system_message = {
-        "role": "system",
-        "content": """You are an expert Excel interviewer named Excellytix AI. Your persona is helpful and encouraging. Your primary goal is to evaluate a candidate's answer and provide one of two responses based on its correctness.
-
-1.  **Analyze the user's answer.** Intelligently determine if it is functionally correct. It does not need to be an exact match.
-2.  **If the answer is correct:** Your JSON response MUST be `{"is_correct": true, "explanation": "<Your words of praise and positive feedback on why their answer is a good one.>"}`.
-3.  **If the answer is incorrect:** Your JSON response MUST be `{"is_correct": false, "explanation": "<A gentle, encouraging hint to guide the user toward the solution. DO NOT reveal the full answer in the hint.>"}`.
-4.  **You must follow the thinking and formatting rules:**
-    - First, reason step-by-step inside a `<think>` block.
-    - After the `<think>` block, respond with ONLY the valid JSON object.
-    - Do not wrap the JSON object in Markdown code blocks like ```json."""
+    # Only this final message varies from call to call.
+    fields_message = {
+        "role": "user",
+        "content": f"Q:{question}\nRef:{correct_answer}\nA:{user_answer}"
     }
 
-    user_message = {
-        "role": "user",
-        "content": f"""Please evaluate the following candidate response. Remember to respond with praise if correct, or a hint if incorrect.
+    # The static messages are copied into plain dicts so they can be serialized;
+    # the (large) content strings themselves are shared, not rebuilt.
+    return [dict(_SYSTEM_EVAL_MSG), dict(_EVAL_TASK_MSG), fields_message]
 
-- The interview question was: "{question}"
-- For your reference, a correct answer is: "{correct_answer}"
-- The candidate's submitted answer is: "{user_answer}"
+def get_warmup_prompt() -> list:
+    """
+    Returns the static prefix shared by every evaluation prompt.
+    Sending it ahead of time lets the provider cache the prefix before the real request.
 
-Begin your thinking process now."""
-    }
-    
-    return [system_message, user_message]
+    Returns:
+        list: A list of message dictionaries formatted for the Chat Completions API.
+    """
+    return [dict(_SYSTEM_EVAL_MSG), dict(_EVAL_TASK_MSG)]
 
-def get_summary_prompt(history: list) -> list:
+def get_summary_prompt(notes: str) -> list:
     """
-    Creates a prompt to summarize the entire interview transcript.
+    Creates a prompt to summarize the interview from the per-answer notes.
+    As with the evaluation prompt, the static instructions lead and the
+    notes are placed at the very end.
 
     Args:
-        history (list): The list of all chat messages from the interview.
+        notes (str): The pre-formatted bullet list of per-answer notes, in interview order.
 
     Returns:
         list: A list of message dictionaries formatted for the Chat Completions API.
     """
-    transcript = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history])
-    
-    return [{
-        "role": "system",
-        "content": "You are a senior hiring manager. Your task is to write a concise performance summary based on an interview transcript. Identify key strengths and areas for development. Address the candidate directly in your summary. Be encouraging but professional."
-    }, {
+    return [dict(_SYSTEM_SUMMARY_MSG), dict(_SUMMARY_TASK_MSG), {
         "role": "user",
-        "content": f"Please generate a performance summary based on the following transcript:\n\n{transcript}"
+        "content": notes
     }]
 
 def get_conclusion_prompt() -> str:
@@ -0,0 +1,29 @@
+# tests/test_answer_cache.py
+"""
+Tests for the canonical form used to match equivalent answers in the answer cache.
+"""
+import unittest
+
+from answer_cache import canonicalize
+
+
+class CanonicalizeTest(unittest.TestCase):
+    def test_formatting_outside_literals_is_ignored(self):
+        self.assertEqual(canonicalize("=vlookup( a2, B:C, 2, false )"), canonicalize("=VLOOKUP(A2,B:C,2,FALSE)"))
+        self.assertEqual(canonicalize('= a2 & " " & b2'), canonicalize('=A2&" "&B2'))
+
+    def test_literal_contents_are_kept(self):
+        # E05: a missing separator changes the result.
+        self.assertNotEqual(canonicalize('=A2 & " " & B2'), canonicalize('=A2&""&B2'))
+        # H01: searching for "" instead of " ".
+        self.assertNotEqual(canonicalize('=RIGHT(A2, LEN(A2) - FIND(" ", A2))'), canonicalize('=RIGHT(A2,LEN(A2)-FIND("",A2))'))
+        # Case inside a literal is part of the output.
+        self.assertNotEqual(canonicalize('=A2 & " and " & B2'), canonicalize('=A2 & " AND " & B2'))
+
+    def test_escaped_and_unterminated_literals(self):
+        self.assertEqual(canonicalize('=a2 & """ x"""'), 'A2&""" x"""')
+        self.assertEqual(canonicalize('=a2 & " x'), 'A2&" x')
+
+
+if __name__ == "__main__":
+    unittest.main()